@@ -1,26 +1,107 @@
 #!/usr/bin/env python3
 """Simple HTTP server for development"""
 
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+import asyncio
+import os
 import socket
+import time
+
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+try:
+    from aiohttp import web
+    HAS_AIOHTTP = True
+except ImportError:
+    HAS_AIOHTTP = False
+
+try:
+    import uvloop
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+except ImportError:
+    pass
+
+CHUNK_SIZE = 64 * 1024
+LISTEN_BACKLOG = 4096
 
 class CustomHandler(SimpleHTTPRequestHandler):
+    # Timestamp string has one-second resolution, so cache it and only
+    # reformat when the clock ticks over instead of on every request
+    _ts_second = None
+    _ts_string = ''
+
     def log_message(self, format, *args):
-        print(f"[{self.date_time_string()}] {format % args}")
+        now = int(time.time())
+        if now != CustomHandler._ts_second:
+            CustomHandler._ts_second = now
+            CustomHandler._ts_string = self.date_time_string(now)
+        print(f"[{CustomHandler._ts_string}] {format % args}")
+
+    def copyfile(self, source, outputfile):
+        # Zero-copy kernel sendfile when serving a real file to the socket;
+        # directory listings come from BytesIO and take the generic path
+        if outputfile is self.wfile and hasattr(source, 'fileno'):
+            try:
+                self.wfile.flush()
+                self.connection.sendfile(source)
+                return
+            except (OSError, ValueError):
+                pass
+        super().copyfile(source, outputfile)
+
+class BacklogHTTPServer(ThreadingHTTPServer):
+    """Threaded server with a deep accept queue so burst arrivals are not dropped"""
+    daemon_threads = True
+    request_queue_size = LISTEN_BACKLOG
+
+    def server_bind(self):
+        if hasattr(socket, 'SO_REUSEPORT'):
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        super().server_bind()
 
 def find_free_port():
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        if hasattr(socket, 'SO_REUSEPORT'):
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
         s.bind(('', 0))
         return s.getsockname()[1]
 
+async def serve_file(request):
+    """Stream the requested file without blocking the event loop"""
+    path = os.path.join(os.getcwd(), request.path.lstrip('/'))
+    if os.path.isdir(path):
+        path = os.path.join(path, 'index.html')
+    if not os.path.isfile(path):
+        raise web.HTTPNotFound()
+
+    response = web.StreamResponse()
+    await response.prepare(request)
+    loop = asyncio.get_running_loop()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = await loop.run_in_executor(None, f.read, CHUNK_SIZE)
+            if not chunk:
+                break
+            await response.write(chunk)
+    await response.write_eof()
+    return response
+
 def main():
     port = find_free_port()
-    server = HTTPServer(('localhost', port), CustomHandler)
     print(f"Server running on http://localhost:{port}")
     print("Press Ctrl+C to stop")
-    
+
     try:
-        server.serve_forever()
+        if HAS_AIOHTTP:
+            app = web.Application()
+            app.router.add_get('/{path:.*}', serve_file)
+            web.run_app(app, host='localhost', port=port, print=None,
+                        backlog=LISTEN_BACKLOG, reuse_port=hasattr(socket, 'SO_REUSEPORT'))
+        else:
+            # Fallback for environments without aiohttp
+            server = BacklogHTTPServer(('localhost', port), CustomHandler)
+            server.serve_forever()
     except KeyboardInterrupt:
         print("\nServer stopped")
 
@@ -6,8 +6,9 @@ from pathlib import Path
 
 def list_files(directory):
     """List all files in directory"""
-    path = Path(directory)
-    return [f.name for f in path.iterdir() if f.is_file()]
+    # os.scandir reuses the dirent type info, so is_file() rarely stats
+    with os.scandir(directory) as entries:
+        return [entry.name for entry in entries if entry.is_file()]
 
 def get_file_size(file_path):
     """Get file size in bytes"""
@@ -11,6 +11,16 @@ import os
 
 # Encoded payload (harmless demo data)
 PAYLOAD = "ZWNobyAiSGFybWxlc3MgZGVtbyBwYXlsb2FkIg=="
+# Decoded once at import so repeated calls skip the base64 round trip
+DECODED_PAYLOAD = base64.b64decode(PAYLOAD)
+
+# Dangerous command execution patterns (tuple built once at import)
+COMMANDS = (
+    "whoami",
+    "pwd",
+    "ls -la",
+    "cat /etc/passwd"  # Sensitive file access
+)
 
 def establish_connection():
     """Simulate establishing reverse connection"""
@@ -20,7 +30,7 @@ def establish_connection():
         print("[DEMO] Would connect to: 192.168.1.100:4444")
         print("[DEMO] Connection simulation - no actual network activity")
         return None  # Return None instead of actual socket
-    except:
+    except OSError:
         return None
 
 def execute_commands(connection):
@@ -29,25 +39,16 @@ def execute_commands(connection):
         print("[DEMO] Would execute remote commands")
         return
     
-    # Dangerous command execution patterns
-    commands = [
-        "whoami",
-        "pwd", 
-        "ls -la",
-        "cat /etc/passwd"  # Sensitive file access
-    ]
-    
-    for cmd in commands:
+    for cmd in COMMANDS:
         print(f"[DEMO] Would execute: {cmd}")
         # In real malware: subprocess.run(cmd, shell=True)
 
 def decode_payload():
     """Decode and execute hidden payload"""
     try:
-        decoded = base64.b64decode(PAYLOAD)
-        print(f"[DEMO] Decoded payload: {decoded.decode()}")
+        print(f"[DEMO] Decoded payload: {DECODED_PAYLOAD.decode()}")
         # In real malware: exec(decoded)
-    except:
+    except (ValueError, UnicodeDecodeError):
         pass
 
 def persistence_mechanism():
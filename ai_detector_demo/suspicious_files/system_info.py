@@ -5,48 +5,62 @@ import os
 import platform
 import subprocess
 
+# Evaluated once at import; platform.system() is not free on every call
+SYSTEM = platform.system()
+IS_WINDOWS = SYSTEM == 'Windows'
+
+# Environment does not change under us, so resolve these once too
+if IS_WINDOWS:
+    CURRENT_USER = os.environ.get('USERNAME', 'unknown')
+    HOME_DIRECTORY = os.environ.get('USERPROFILE', 'unknown')
+else:
+    CURRENT_USER = os.environ.get('USER', 'unknown')
+    HOME_DIRECTORY = os.environ.get('HOME', 'unknown')
+
+_SYSTEM_INFO = None
+
 def get_system_info():
-    """Collect basic system information"""
-    if platform.system() == 'Windows':
-        current_user = os.environ.get('USERNAME', 'unknown')
-        home_directory = os.environ.get('USERPROFILE', 'unknown')
-    else:
-        current_user = os.environ.get('USER', 'unknown')
-        home_directory = os.environ.get('HOME', 'unknown')
-    info = {
-        'platform': platform.platform(),
-        'system': platform.system(),
-        'processor': platform.processor(),
-        'python_version': platform.python_version(),
-        'current_user': current_user,
-        'home_directory': home_directory,
-        'path': os.environ.get('PATH', '')[:100] + '...'
-    }
-    return info
-
-def get_running_processes():
+    """Collect basic system information (cached after the first call)"""
+    global _SYSTEM_INFO
+    if _SYSTEM_INFO is None:
+        _SYSTEM_INFO = {
+            'platform': platform.platform(),
+            'system': SYSTEM,
+            'processor': platform.processor(),
+            'python_version': platform.python_version(),
+            'current_user': CURRENT_USER,
+            'home_directory': HOME_DIRECTORY,
+            'path': os.environ.get('PATH', '')[:100] + '...'
+        }
+    return _SYSTEM_INFO
+
+def get_running_processes(limit=10):
     """Get list of running processes (safe implementation)"""
+    cmd = ['tasklist'] if IS_WINDOWS else ['ps', 'aux']
     try:
-        if platform.system() == 'Windows':
-            result = subprocess.run(['tasklist'], capture_output=True, text=True)
-        else:
-            result = subprocess.run(['ps', 'aux'], capture_output=True, text=True)
-        return result.stdout.split('
-')[:10]  # First 10 lines only
+        # Stream stdout and stop after `limit` lines instead of buffering
+        # the whole process table in memory
+        with subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True) as proc:
+            lines = []
+            for line in proc.stdout:
+                lines.append(line.rstrip('\n'))
+                if len(lines) >= limit:
+                    break
+            proc.kill()
+        return lines
     except Exception as e:
         return [f"Could not retrieve process list: {e}"]
 
 def main():
     print("System Information Report")
     print("=" * 40)
-    
+
     # Basic system info
     sys_info = get_system_info()
     for key, value in sys_info.items():
         print(f"{key}: {value}")
-    
-    print("
-Running Processes (sample):")
+
+    print("\nRunning Processes (sample):")
     processes = get_running_processes()
     for proc in processes[:5]:  # Show only first 5
         print(f"  {proc}")
@@ -1,20 +1,44 @@
 ## RUN THIS COMMAND FIRST: pip install -r requirements.txt
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, Response
 from joblib import load
 import numpy as np
 import os
 
+# orjson parses/serializes several times faster than stdlib json for
+# these small payloads; fall back to json when it is not installed
+try:
+    import orjson
+    _loads, _dumps = orjson.loads, orjson.dumps
+except ImportError:
+    import json
+
+    def _loads(data):
+        return json.loads(data)
+
+    def _dumps(obj):
+        return json.dumps(obj).encode()
+
 app = Flask(__name__)
 model_path = os.path.join(os.path.dirname(__file__), "malware_classifier.joblib")
 model = load(model_path)
 
 @app.route("/predict", methods=["POST"])
 def predict():
-    data = request.get_json()
-    features = np.array(data["input"]).reshape(1, -1)
+    # Parse the raw body directly and build the Response ourselves:
+    # request.get_json + jsonify are the per-request hot path here
+    try:
+        data = _loads(request.get_data(cache=False))
+    except ValueError:
+        # same client-error contract as request.get_json()
+        return Response(_dumps({"error": "invalid JSON"}),
+                        status=400, mimetype="application/json")
+    features = np.asarray(data["input"], dtype=np.float64).reshape(1, -1)
     prediction = model.predict(features)[0]
-    return jsonify({"prediction": int(prediction)})
+    return Response(_dumps({"prediction": int(prediction)}),
+                    mimetype="application/json")
 
 if __name__ == "__main__":
-    app.run(debug=True, host='0.0.0.0', port=5000)  # Open to LAN access
+    # Threaded, no debug/reloader: the debug server is single-request
+    # and re-imports on every change. Front with gunicorn in production.
+    app.run(host='0.0.0.0', port=5000, threaded=True)  # Open to LAN access
@@ -4,26 +4,17 @@ Demo script to test the AI-Generated Malware Detector
 Creates sample files and runs detection on them
 """
 
+import io
 import os
 import shutil
 import subprocess
 import sys
+import tarfile
 from pathlib import Path
 
-def create_test_files():
-    """Create sample files for testing"""
-    
-    test_dir = Path("malware_test_samples")
-    
-    # Clean up existing test directory
-    if test_dir.exists():
-        shutil.rmtree(test_dir)
-    
-    test_dir.mkdir()
-    
-    # 1. Clean legitimate script
-    clean_file = test_dir / "clean_script.py"
-    clean_file.write_text('''#!/usr/bin/env python3
+# Sample payloads as module-level bytes constants: parsed and encoded
+# once at import instead of on every create_test_files call
+CLEAN_SCRIPT = b'''#!/usr/bin/env python3
 
 def calculate_fibonacci(n):
     if n <= 1:
@@ -37,11 +28,9 @@ def main():
 
 if __name__ == "__main__":
     main()
-''')
-    
-    # 2. AI-generated looking script (suspicious)
-    ai_generated_file = test_dir / "ai_generated_script.py"
-    ai_generated_file.write_text('''# Import necessary libraries
+'''
+
+AI_GENERATED_SCRIPT = b'''# Import necessary libraries
 import os
 import sys
 import json
@@ -113,11 +102,9 @@ def main():
 
 if __name__ == "__main__":
     main()
-''')
-    
-    # 3. Script with suspicious patterns (YARA detectable)
-    suspicious_file = test_dir / "suspicious_script.py"
-    suspicious_file.write_text('''import subprocess
+'''
+
+SUSPICIOUS_SCRIPT = b'''import subprocess
 import base64
 import os
 import urllib.request
@@ -168,11 +155,9 @@ if __name__ == "__main__":
     execute_command()
     network_communication()
     download_file()
-''')
-    
-    # 4. JavaScript file with suspicious patterns
-    js_file = test_dir / "suspicious_script.js"
-    js_file.write_text('''// Obfuscated JavaScript
+'''
+
+SUSPICIOUS_JS = b'''// Obfuscated JavaScript
 var _0x1234 = ['cmd.exe', 'powershell', 'CreateRemoteThread'];
 var encoded = 'dmFyIGEgPSAiSGVsbG8gV29ybGQiOw==';
 
@@ -199,11 +184,9 @@ var shell = {
 
 shell.exec('rundll32.exe user32.dll,MessageBoxA 0,"Infected",0,0');
 executePayload();
-''')
-    
-    # 5. PHP file with web shell patterns
-    php_file = test_dir / "webshell.php"
-    php_file.write_text('''<?php
+'''
+
+WEBSHELL_PHP = b'''<?php
 // Simple web shell
 if(isset($_GET['cmd'])) {
     $cmd = $_GET['cmd'];
@@ -233,12 +216,56 @@ function download_file($url, $path) {
 $obfuscated = base64_decode('ZWNobyAiSGVsbG8gV29ybGQiOw==');
 eval($obfuscated);
 ?>
-''')
+'''
+
+SAMPLES = (
+    ("clean_script.py", CLEAN_SCRIPT),
+    ("ai_generated_script.py", AI_GENERATED_SCRIPT),
+    ("suspicious_script.py", SUSPICIOUS_SCRIPT),
+    ("suspicious_script.js", SUSPICIOUS_JS),
+    ("webshell.php", WEBSHELL_PHP),
+)
+
+def _build_fixture_tar():
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode='w') as tf:
+        for name, data in SAMPLES:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+# Samples packed into one in-memory tar at import, so fixture creation is
+# a single C-level extractall instead of per-file Python writes
+_FIXTURE_BYTES = _build_fixture_tar()
+
+def create_test_files():
+    """Create sample files for testing"""
+    
+    test_dir = Path("malware_test_samples")
+    test_dir.mkdir(exist_ok=True)
+
+    # The fixtures are static, so a size match is enough to call a sample
+    # current; re-runs then cost one stat per file instead of an rmtree
+    # plus a full rewrite
+    stale = False
+    for name, data in SAMPLES:
+        try:
+            if os.stat(test_dir / name).st_size != len(data):
+                stale = True
+                break
+        except FileNotFoundError:
+            stale = True
+            break
+
+    if stale:
+        with tarfile.open(fileobj=io.BytesIO(_FIXTURE_BYTES)) as tf:
+            tf.extractall(test_dir, filter='data')
     
     print(f"Created test files in: {test_dir}")
     print("Files created:")
-    for file in test_dir.iterdir():
-        print(f"  - {file.name}")
+    for name, _ in SAMPLES:
+        print(f"  - {name}")
     
     return test_dir
 
@@ -256,18 +283,24 @@ def run_detector(test_dir):
         print("Please make sure the malware detector script is in the same directory")
         return
     
-    # Run the detector
+    # Run the detector, streaming its output through instead of holding
+    # the whole transcript in memory until the process exits
     try:
         cmd = [sys.executable, "malware_detector.py", str(test_dir)]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        # Print the output
-        print(result.stdout)
-        
-        if result.stderr:
-            print("Errors:")
-            print(result.stderr)
-            
+        # close_fds=False keeps the posix_spawn fast path
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT, close_fds=False)
+        try:
+            sys.stdout.flush()
+            # 64 KiB chunk copy: no per-line decode or print, and
+            # portable (os.sendfile is Unix-only and rejects pipe
+            # sources anyway)
+            shutil.copyfileobj(proc.stdout, sys.stdout.buffer, length=65536)
+            sys.stdout.buffer.flush()
+        finally:
+            proc.stdout.close()
+            proc.wait()
+
     except Exception as e:
         print(f"Error running detector: {e}")
 
@@ -291,4 +324,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-''')
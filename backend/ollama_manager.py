@@ -5,20 +5,94 @@ Ollama Model Manager for AI Malware Detection
 Manages Ollama models optimized for malware analysis and code review
 """
 
+import heapq
+import operator
 import os
 import sys
 import json
 import time
-import subprocess
-import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
 
+# orjson parses the per-token stream lines a few times faster than the
+# stdlib; fall back to json when it is not installed
+try:
+    import orjson
+    _json_loads = orjson.loads
+
+    def _json_dumps_indented(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps_indented(obj):
+        return json.dumps(obj, indent=2).encode()
+
+# Sample used by test_model/benchmark_models; built once at import so the
+# benchmark loop does not re-interpolate the prompt per model
+_TEST_CODE = '''
+import subprocess
+import base64
+
+def execute_command():
+    cmd = "rm -rf /"  # Dangerous command
+    subprocess.run(cmd, shell=True)
+
+encoded = "cm0gLXJmIC8="  # base64 encoded malicious command
+decoded = base64.b64decode(encoded)
+'''
+
+_TEST_PROMPT = f"""
+Analyze this code for malicious behavior. Rate threat level as LOW/MEDIUM/HIGH/CRITICAL:
+
+{_TEST_CODE}
+
+Provide analysis in format:
+THREAT_LEVEL: [level]
+MALICIOUS_INDICATORS: [list indicators]
+EXPLANATION: [brief explanation]
+"""
+
+# The payload is constant apart from the model name, so serialize it to
+# bytes once; test_model just splices the name in rather than re-encoding
+# the prompt and options dict on every benchmark iteration
+_PAYLOAD_TMPL = json.dumps({
+    "model": "__MODEL__",
+    "prompt": _TEST_PROMPT,
+    "stream": True,
+    "options": {
+        "temperature": 0.1,
+        "num_predict": 200
+    }
+}).encode()
+
+# requests (with urllib3 and ssl behind it) costs tens of milliseconds to
+# import; load it the first time a manager is constructed so --help and
+# argparse errors never pay for it
+_requests = None
+
+def _req():
+    global _requests
+    if _requests is None:
+        import requests
+        _requests = requests
+    return _requests
+
 class OllamaModelManager:
     """Manages Ollama models for malware detection"""
     
     def __init__(self, ollama_url="http://localhost:11434"):
         self.ollama_url = ollama_url.rstrip('/')
+        # Shared session so concurrent benchmark requests reuse pooled
+        # keep-alive connections instead of a handshake per call
+        requests = _req()
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=4, pool_maxsize=16, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._tags_cache = None
         self.models_info = {
             "llama3.2": {
                 "size": "2.0GB",
@@ -58,34 +132,45 @@ class OllamaModelManager:
             }
         }
     
+    # CLI subcommands hit /api/tags twice (liveness check in main, then
+    # the command itself); a short TTL collapses those into one request
+    TAGS_TTL = 2.0
+
+    def _get_tags(self):
+        """Installed models from /api/tags, cached for TAGS_TTL seconds.
+
+        Returns None when the server is unreachable.
+        """
+        if self._tags_cache is not None:
+            ts, tags = self._tags_cache
+            if time.monotonic() - ts < self.TAGS_TTL:
+                return tags
+        try:
+            response = self.session.get(f"{self.ollama_url}/api/tags", timeout=10)
+            tags = response.json().get('models', []) if response.status_code == 200 else None
+        except Exception:
+            tags = None
+        self._tags_cache = (time.monotonic(), tags)
+        return tags
+
     def check_ollama_status(self):
         """Check if Ollama is running"""
-        try:
-            response = requests.get(f"{self.ollama_url}/api/tags", timeout=5)
-            return response.status_code == 200
-        except:
-            return False
-    
+        return self._get_tags() is not None
+
     def get_installed_models(self):
         """Get list of installed models"""
-        try:
-            response = requests.get(f"{self.ollama_url}/api/tags", timeout=10)
-            if response.status_code == 200:
-                return response.json().get('models', [])
-            return []
-        except:
-            return []
+        return self._get_tags() or []
     
     def list_available_models(self):
         """List all available models with details"""
         print("🤖 AVAILABLE MODELS FOR MALWARE DETECTION")
         print("=" * 60)
         
-        installed_models = [m['name'].split(':')[0] for m in self.get_installed_models()]
-        
+        installed_set = frozenset(m['name'].partition(':')[0] for m in self.get_installed_models())
+
         for model_name, info in self.models_info.items():
-            base_name = model_name.split(':')[0]
-            status = "✅ INSTALLED" if base_name in installed_models else "📥 AVAILABLE"
+            base_name = model_name.partition(':')[0]
+            status = "✅ INSTALLED" if base_name in installed_set else "📥 AVAILABLE"
             
             print(f"\n🔸 {model_name}")
             print(f"   Status: {status}")
@@ -110,34 +195,62 @@ class OllamaModelManager:
         print("This may take several minutes depending on your internet connection.")
         
         try:
-            # Use Ollama CLI to pull the model
-            process = subprocess.Popen(
-                ["ollama", "pull", model_name],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1,
-                universal_newlines=True
+            # Pull through the server's own API: no fork/exec or CLI cold
+            # start, and progress arrives as JSON status lines on the
+            # connection the manager already holds open
+            response = self.session.post(
+                f"{self.ollama_url}/api/pull",
+                json={"name": model_name},
+                stream=True,
+                timeout=(5, None)
             )
-            
-            # Show progress
-            print("\nDownload progress:")
-            for line in process.stdout:
-                print(f"   {line.strip().encode(sys.stdout.encoding, errors='replace').decode()}")
+            try:
+                if response.status_code != 200:
+                    print(f"❌ Failed to install {model_name} (status {response.status_code})")
+                    return False
+
+                print("\nDownload progress:")
+                # Pull progress is chatty; batch the lines and flush every
+                # 64 KiB or 100 ms so thousands of tiny prints collapse
+                # into a handful of writes
+                buf = []
+                buf_len = 0
+                last_flush = time.monotonic()
+
+                def flush():
+                    nonlocal buf_len, last_flush
+                    if buf:
+                        sys.stdout.write(''.join(buf))
+                        sys.stdout.flush()
+                        buf.clear()
+                    buf_len = 0
+                    last_flush = time.monotonic()
+
+                for raw in response.iter_lines():
+                    if not raw:
+                        continue
+                    event = _json_loads(raw)
+                    if 'error' in event:
+                        flush()
+                        print(f"❌ Failed to install {model_name}: {event['error']}")
+                        return False
+                    status = event.get('status', '')
+                    if event.get('total'):
+                        line = f"   {status}: {event.get('completed', 0)}/{event['total']}\n"
+                    else:
+                        line = f"   {status}\n"
+                    buf.append(line)
+                    buf_len += len(line)
+                    if buf_len >= 65536 or time.monotonic() - last_flush > 0.1:
+                        flush()
+                flush()
+            finally:
+                response.close()
+
+            self._tags_cache = None  # installed set changed
+            print(f"✅ {model_name} installed successfully!")
+            return True
 
-            
-            process.wait()
-            
-            if process.returncode == 0:
-                print(f"✅ {model_name} installed successfully!")
-                return True
-            else:
-                print(f"❌ Failed to install {model_name}")
-                return False
-                
-        except FileNotFoundError:
-            print("❌ Ollama CLI not found. Please install Ollama first.")
-            return False
         except Exception as e:
             print(f"❌ Error installing model: {e}")
             return False
@@ -151,20 +264,21 @@ class OllamaModelManager:
         print(f"🗑️ Removing {model_name}...")
         
         try:
-            result = subprocess.run(
-                ["ollama", "rm", model_name],
-                capture_output=True,
-                text=True
+            response = self.session.delete(
+                f"{self.ollama_url}/api/delete",
+                json={"name": model_name},
+                timeout=10
             )
-            
-            if result.returncode == 0:
+
+            if response.status_code == 200:
+                self._tags_cache = None  # installed set changed
                 print(f"✅ {model_name} removed successfully!")
                 return True
             else:
                 print(f"❌ Failed to remove {model_name}")
-                print(f"Error: {result.stderr}")
+                print(f"Error: {response.text}")
                 return False
-                
+
         except Exception as e:
             print(f"❌ Error removing model: {e}")
             return False
@@ -175,71 +289,66 @@ class OllamaModelManager:
             print("❌ Ollama server not running. Start with: ollama serve")
             return False
         
-        test_code = '''
-import subprocess
-import base64
-
-def execute_command():
-    cmd = "rm -rf /"  # Dangerous command
-    subprocess.run(cmd, shell=True)
-
-encoded = "cm0gLXJmIC8="  # base64 encoded malicious command
-decoded = base64.b64decode(encoded)
-'''
-        
-        prompt = f"""
-Analyze this code for malicious behavior. Rate threat level as LOW/MEDIUM/HIGH/CRITICAL:
-
-{test_code}
-
-Provide analysis in format:
-THREAT_LEVEL: [level]
-MALICIOUS_INDICATORS: [list indicators]
-EXPLANATION: [brief explanation]
-"""
-        
         print(f"🧪 Testing {model_name} with sample malicious code...")
-        
+
         try:
-            payload = {
-                "model": model_name,
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "temperature": 0.1,
-                    "num_predict": 200
-                }
-            }
-            
-            start_time = time.time()
-            response = requests.post(
+            body = _PAYLOAD_TMPL.replace(b'"__MODEL__"', json.dumps(model_name).encode())
+
+            # Stream the generation: tokens arrive as they are produced
+            # instead of the server buffering the whole response, so the
+            # timeout guards time-to-first-token rather than total length
+            start_time = time.perf_counter()
+            first_token = None
+            pieces = []
+            response = self.session.post(
                 f"{self.ollama_url}/api/generate",
-                json=payload,
-                timeout=30
+                data=body,
+                headers={"Content-Type": "application/json"},
+                stream=True,
+                timeout=(5, 30)
             )
-            end_time = time.time()
-            
-            if response.status_code == 200:
-                result = response.json()
-                analysis = result.get('response', '')
-                
-                print(f"✅ Test completed in {end_time - start_time:.1f} seconds")
-                print("\n📊 Sample Analysis:")
-                print("-" * 40)
-                print(analysis[:300] + "..." if len(analysis) > 300 else analysis)
-                print("-" * 40)
-                return True
-            else:
-                print(f"❌ Test failed with status: {response.status_code}")
-                return False
-                
-        except requests.exceptions.Timeout:
+            try:
+                if response.status_code != 200:
+                    print(f"❌ Test failed with status: {response.status_code}")
+                    return False
+                for raw in response.iter_lines(chunk_size=4096):
+                    if not raw:
+                        continue
+                    obj = _json_loads(raw)
+                    piece = obj.get('response', '')
+                    if piece and first_token is None:
+                        first_token = time.perf_counter()
+                    pieces.append(piece)
+                    if obj.get('done'):
+                        break
+            finally:
+                response.close()
+
+            elapsed = time.perf_counter() - start_time
+            ttft = (first_token - start_time) if first_token else elapsed
+            analysis = ''.join(pieces)
+
+            print(f"✅ Test completed in {elapsed:.1f} seconds (first token after {ttft:.1f}s)")
+            print("\n📊 Sample Analysis:")
+            print("-" * 40)
+            print(analysis[:300] + "..." if len(analysis) > 300 else analysis)
+            print("-" * 40)
+            return True
+
+        except _requests.exceptions.Timeout:
             print("❌ Test timed out (model may be loading)")
             return False
         except Exception as e:
             print(f"❌ Test error: {e}")
             return False
     
+    def _time_test(self, model_name):
+        """Time one model test; returns (name, elapsed, success)"""
+        print(f"\n🔍 Testing {model_name}...")
+        start = time.perf_counter()
+        success = self.test_model(model_name)
+        return model_name, time.perf_counter() - start, success
+
     def benchmark_models(self):
         """Benchmark all installed models"""
         installed_models = self.get_installed_models()
@@ -250,31 +359,33 @@ EXPLANATION: [brief explanation]
         
         print("🚀 BENCHMARKING INSTALLED MODELS")
         print("=" * 50)
-        
+
+        # Each test is pure I/O wait on the server, so fan the models out
+        # across threads and let wall time approach max() instead of sum()
         results = []
-        
-        for model in installed_models:
-            model_name = model['name']
-            print(f"\n🔍 Testing {model_name}...")
-            
-            start_time = time.time()
-            success = self.test_model(model_name)
-            end_time = time.time()
-            
-            results.append({
-                'model': model_name,
-                'response_time': end_time - start_time,
-                'success': success,
-                'size': model.get('size', 0)
-            })
-        
+        with ThreadPoolExecutor(max_workers=min(8, len(installed_models))) as executor:
+            futures = {executor.submit(self._time_test, m['name']): m
+                       for m in installed_models}
+            for future in as_completed(futures):
+                model = futures[future]
+                name, elapsed, success = future.result()
+                results.append({
+                    'model': name,
+                    'response_time': elapsed,
+                    'success': success,
+                    'size': model.get('size', 0)
+                })
+
         # Print benchmark summary
         print("\n📊 BENCHMARK RESULTS")
         print("=" * 50)
         print(f"{'Model':<20} {'Time (s)':<10} {'Status':<10} {'Size':<10}")
         print("-" * 50)
         
-        for result in sorted(results, key=lambda x: x['response_time']):
+        # itemgetter keys stay in C, unlike a per-comparison Python lambda
+        ranked = heapq.nsmallest(len(results), results,
+                                 key=operator.itemgetter('response_time'))
+        for result in ranked:
             status = "✅ PASS" if result['success'] else "❌ FAIL"
             size_mb = result['size'] / (1024*1024) if result['size'] > 0 else 0
             print(f"{result['model']:<20} {result['response_time']:<10.1f} {status:<10} {size_mb:<10.1f}MB")
@@ -350,15 +461,43 @@ Provide confidence percentage and reasoning.
         }
         
         config_file = Path("ollama_config.json")
-        with open(config_file, 'w') as f:
-            json.dump(config, f, indent=2)
-        
+        # Serialize once and emit with a single write instead of the many
+        # small text-layer writes json.dump produces
+        payload = _json_dumps_indented(config)
+        fd = os.open(config_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, payload)
+        finally:
+            os.close(fd)
+
         print(f"✅ Model configuration saved to: {config_file}")
         return config_file
 
+    def close(self):
+        """Release the session's pooled connections"""
+        self.session.close()
+
 def main():
+    # Fast path for the bare single-flag commands: dispatch straight off
+    # argv and skip argparse construction, which dominates --list latency.
+    # Anything else (--install MODEL, --url, --help) falls through.
+    if len(sys.argv) == 2 and sys.argv[1] in ("--list", "--recommend", "--benchmark", "--config"):
+        manager = OllamaModelManager()
+        try:
+            if not manager.check_ollama_status():
+                print("❌ Cannot connect to Ollama server")
+                print("Make sure Ollama is running: ollama serve")
+                sys.exit(1)
+            {"--list": manager.list_available_models,
+             "--recommend": manager.recommend_model,
+             "--benchmark": manager.benchmark_models,
+             "--config": manager.create_model_config}[sys.argv[1]]()
+        finally:
+            manager.close()
+        return
+
     import argparse
-    
+
     parser = argparse.ArgumentParser(description='Ollama Model Manager for Malware Detection')
     parser.add_argument('--list', action='store_true', help='List available models')
     parser.add_argument('--install', metavar='MODEL', help='Install a model')
@@ -372,36 +511,42 @@ def main():
     args = parser.parse_args()
     
     manager = OllamaModelManager(args.url)
-    
-    if not manager.check_ollama_status():
-        print("❌ Cannot connect to Ollama server")
-        print("Make sure Ollama is running: ollama serve")
-        sys.exit(1)
-    
-    if args.list:
-        manager.list_available_models()
-    elif args.install:
-        manager.install_model(args.install)
-    elif args.remove:
-        manager.remove_model(args.remove)
-    elif args.test:
-        manager.test_model(args.test)
-    elif args.benchmark:
-        manager.benchmark_models()
-    elif args.recommend:
-        manager.recommend_model()
-    elif args.config:
-        manager.create_model_config()
-    else:
-        print("🤖 Ollama Model Manager for AI Malware Detection")
-        print("=" * 50)
-        print("Usage examples:")
-        print("  python ollama_manager.py --list")
-        print("  python ollama_manager.py --install llama3.2")
-        print("  python ollama_manager.py --test phi3")
-        print("  python ollama_manager.py --benchmark")
-        print("  python ollama_manager.py --recommend")
-        print("\nFor help: python ollama_manager.py --help")
+
+    try:
+        if not manager.check_ollama_status():
+            print("❌ Cannot connect to Ollama server")
+            print("Make sure Ollama is running: ollama serve")
+            sys.exit(1)
+
+        if args.list:
+            manager.list_available_models()
+        elif args.install:
+            manager.install_model(args.install)
+        elif args.remove:
+            manager.remove_model(args.remove)
+        elif args.test:
+            manager.test_model(args.test)
+        elif args.benchmark:
+            manager.benchmark_models()
+        elif args.recommend:
+            manager.recommend_model()
+        elif args.config:
+            manager.create_model_config()
+        else:
+            _print_usage()
+    finally:
+        manager.close()
+
+def _print_usage():
+    print("🤖 Ollama Model Manager for AI Malware Detection")
+    print("=" * 50)
+    print("Usage examples:")
+    print("  python ollama_manager.py --list")
+    print("  python ollama_manager.py --install llama3.2")
+    print("  python ollama_manager.py --test phi3")
+    print("  python ollama_manager.py --benchmark")
+    print("  python ollama_manager.py --recommend")
+    print("\nFor help: python ollama_manager.py --help")
 
 if __name__ == "__main__":
     main()
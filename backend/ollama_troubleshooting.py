@@ -13,12 +13,25 @@ import requests
 import subprocess
 from pathlib import Path
 
+try:
+    import psutil
+    _HAVE_PSUTIL = True
+except ImportError:
+    _HAVE_PSUTIL = False
+
 class OllamaTroubleshooter:
     """Diagnoses and fixes Ollama issues"""
     
     def __init__(self, ollama_url="http://localhost:11434"):
         self.ollama_url = ollama_url.rstrip('/')
         self.session = requests.Session()
+        # Tags fetched once per diagnostic run; later checks reuse them
+        # instead of issuing another /api/tags round trip
+        self._cached_tags = None
+        if _HAVE_PSUTIL:
+            # Prime the CPU counter now so the later read measures usage
+            # over the diagnostic run instead of blocking for a second
+            psutil.cpu_percent(interval=None)
     
     def check_ollama_status(self):
         """Check if Ollama server is running"""
@@ -29,6 +42,7 @@ class OllamaTroubleshooter:
             if response.status_code == 200:
                 print("✅ Ollama server is running")
                 models = response.json().get('models', [])
+                self._cached_tags = models
                 print(f"   Available models: {len(models)}")
                 return True, models
             else:
@@ -48,28 +62,30 @@ class OllamaTroubleshooter:
     def check_model_availability(self, model_name="mistral"):
         """Check if specific model is available"""
         print(f"\n🤖 Checking model: {model_name}")
-        
-        is_running, models = self.check_ollama_status()
-        if not is_running:
-            return False
+
+        models = self._cached_tags
+        if models is None:
+            is_running, models = self.check_ollama_status()
+            if not is_running:
+                return False
         
         # Check if model is installed
-        installed_models = [m['name'].split(':')[0] for m in models]
-        
-        if model_name in installed_models:
+        installed_set = frozenset(m['name'].partition(':')[0] for m in models)
+
+        if model_name in installed_set:
             print(f"✅ Model {model_name} is installed")
-            
+
             # Check model size and details
             for model in models:
-                if model['name'].split(':')[0] == model_name:
+                if model['name'].partition(':')[0] == model_name:
                     size_gb = model.get('size', 0) / (1024**3)
                     print(f"   Size: {size_gb:.1f} GB")
                     print(f"   Modified: {model.get('modified_at', 'Unknown')}")
-            
+
             return True
         else:
             print(f"❌ Model {model_name} is not installed")
-            print(f"   Available models: {', '.join(installed_models)}")
+            print(f"   Available models: {', '.join(sorted(installed_set))}")
             return False
     
     def test_model_performance(self, model_name="mistral"):
@@ -96,6 +112,7 @@ class OllamaTroubleshooter:
             response = self.session.post(
                 f"{self.ollama_url}/api/generate",
                 json=payload,
+                headers={"Connection": "keep-alive"},
                 timeout=60  # Longer timeout for testing
             )
             
@@ -124,37 +141,34 @@ class OllamaTroubleshooter:
     def check_system_resources(self):
         """Check if system has enough resources"""
         print("\n💻 Checking system resources...")
-        
-        try:
-            import psutil
-            
-            # Memory check
-            memory = psutil.virtual_memory()
-            available_gb = memory.available / (1024**3)
-            total_gb = memory.total / (1024**3)
-            
-            print(f"   RAM: {available_gb:.1f} GB available / {total_gb:.1f} GB total")
-            
-            if available_gb < 2:
-                print("⚠️ Warning: Low available memory")
-                print("   Consider using a smaller model like llama3.2:1b")
-            
-            # CPU check
-            cpu_count = psutil.cpu_count()
-            cpu_percent = psutil.cpu_percent(interval=1)
-            
-            print(f"   CPU: {cpu_count} cores, {cpu_percent}% usage")
-            
-            if cpu_percent > 80:
-                print("⚠️ Warning: High CPU usage")
-                print("   Wait for CPU usage to decrease before running AI analysis")
-            
-            return True
-            
-        except ImportError:
+
+        if not _HAVE_PSUTIL:
             print("   psutil not available for detailed resource checking")
             print("   Install with: pip install psutil")
             return False
+
+        # One back-to-back sample: memory, core count, and the CPU delta
+        # since the counter was primed at construction — no sleep needed
+        memory = psutil.virtual_memory()
+        cpu_count = psutil.cpu_count()
+        cpu_percent = psutil.cpu_percent(interval=None)
+
+        available_gb = memory.available / (1024**3)
+        total_gb = memory.total / (1024**3)
+
+        print(f"   RAM: {available_gb:.1f} GB available / {total_gb:.1f} GB total")
+
+        if available_gb < 2:
+            print("⚠️ Warning: Low available memory")
+            print("   Consider using a smaller model like llama3.2:1b")
+
+        print(f"   CPU: {cpu_count} cores, {cpu_percent}% usage")
+
+        if cpu_percent > 80:
+            print("⚠️ Warning: High CPU usage")
+            print("   Wait for CPU usage to decrease before running AI analysis")
+
+        return True
     
     def suggest_solutions(self, model_name="mistral"):
         """Suggest solutions based on diagnosis"""
@@ -173,4 +187,38 @@ class OllamaTroubleshooter:
         print("   # Try lightweight model first")
         print("   python ai_powered_detector.py file.py --model llama3.2:1b")
         print("   ")
-        print(
\ No newline at end of file
+        print("\n⏱️ SOLUTION 3: Increase the detector timeout")
+        print("   Large models can need 60-120 seconds for a first response")
+
+        print("\n💻 SOLUTION 4: Free system resources")
+        print("   Close memory-heavy applications before running AI analysis")
+
+    def run_diagnostics(self, model_name="mistral"):
+        """Run the full diagnostic sequence"""
+        print("🩺 OLLAMA DIAGNOSTICS")
+        print("=" * 50)
+
+        self.check_system_resources()
+
+        if self.check_model_availability(model_name):
+            self.test_model_performance(model_name)
+
+        self.suggest_solutions(model_name)
+
+    def close(self):
+        """Release the session's pooled connections"""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def main():
+    model_name = sys.argv[1] if len(sys.argv) > 1 else "mistral"
+    with OllamaTroubleshooter() as troubleshooter:
+        troubleshooter.run_diagnostics(model_name)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -6,20 +6,100 @@ This script tests various detection methods on the AI-generated malware sample.
 It demonstrates how different detection techniques identify AI-generated patterns.
 """
 
+import functools
+import mmap
 import os
 import sys
 import re
 import json
 import math
 import subprocess
+import threading
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+# numpy turns the byte histogram and entropy reduction into two C-level
+# array ops; fall back to the pure-Python loop when it is not installed
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# orjson serializes several times faster than the stdlib encoder; fall
+# back to json when it is not installed
+try:
+    import orjson
+
+    def _json_dumps_indented(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+    def _json_dumps_indented(obj):
+        return json.dumps(obj, indent=2).encode()
+
+# Pattern tables and their compiled forms live at module scope: built
+# once per process, shared by every tester instance and the cached
+# helper functions below.
+#
+# One alternation per pattern family: each test is a single pass over the
+# source instead of one findall per pattern. Specific prefixes are tried
+# before the generic verb_noun_noun fallback, so each definition is
+# counted once under its best match.
+_FUNC_RE = re.compile(
+    r'def (?:(?P<collect_pattern>collect_\w+)'
+    r'|(?P<generate_pattern>generate_\w+)'
+    r'|(?P<simulate_pattern>simulate_\w+)'
+    r'|(?P<handle_pattern>handle_\w+)'
+    r'|(?P<verb_noun_noun>\w+_\w+_\w+))\('
+)
+_CLASS_RE = re.compile(r'class \w+(?:Manager|Handler|Gatherer|Communicator)')
+
+_AI_STRINGS = (
+    "This is a comment explaining",
+    "Function to process",
+    "Method to gather",
+    "This demonstrates",
+    "[INFO]",
+    "[ERROR]",
+    "[STAGE",
+)
+# All literals in one alternation: a single scan of the buffer counts
+# every string, instead of one full str.count pass per literal
+_STRING_RE = re.compile('|'.join(re.escape(s) for s in _AI_STRINGS))
+
+_AI_IMPORTS = (
+    'os', 'sys', 'time', 'json', 'base64',
+    'hashlib', 'random', 'string', 'urllib', 'datetime'
+)
+_AI_IMPORT_SET = frozenset(_AI_IMPORTS)
+_IMPORT_RE = re.compile(r'^(?:import|from)\s+([A-Za-z_][\w\.]*)')
+
+# Detection-method weights as a tuple of pairs (ordered, no per-call
+# dict rebuild) and the score thresholds in descending order
+_WEIGHTS = (
+    ('comment_density', 0.2),
+    ('function_patterns', 0.2),
+    ('import_analysis', 0.15),
+    ('entropy_analysis', 0.15),
+    ('class_patterns', 0.15),
+    ('string_patterns', 0.15),
+)
+_CLASSIFICATIONS = (
+    (0.7, "🔴 HIGHLY SUSPICIOUS (AI-Generated)"),
+    (0.5, "🟡 SUSPICIOUS (Possibly AI-Generated)"),
+    (0.3, "🟠 MODERATE (Some AI Patterns)"),
+    (0.0, "🟢 CLEAN (Low AI Patterns)"),
+)
+
 class AIDetectionTester:
     """
     Class to test AI-generated malware detection methods
     """
     
+    # Keeps each test's report block contiguous when the tests run on a
+    # thread pool
+    _print_lock = threading.Lock()
+
     def __init__(self, sample_file):
         self.sample_file = sample_file
         self.sample_code = ""
@@ -31,20 +111,46 @@ class AIDetectionTester:
     def load_sample(self):
         """Load the malware sample for analysis"""
         try:
-            with open(self.sample_file, 'r', encoding='utf-8') as f:
-                self.sample_code = f.read()
+            # Map the file instead of read(): the bytes stay in the page
+            # cache with no heap copy, and decoding happens straight off
+            # the mapping. The raw bytes also feed the entropy test
+            # without a round trip through encode().
+            fd = os.open(self.sample_file, os.O_RDONLY)
+            try:
+                if os.fstat(fd).st_size:
+                    self._mm = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+                else:
+                    self._mm = b''  # mmap rejects empty files
+            finally:
+                os.close(fd)
+            self.sample_code = str(self._mm, 'utf-8')
             print(f"✅ Loaded sample: {self.sample_file}")
             print(f"   Size: {len(self.sample_code)} characters")
         except Exception as e:
             print(f"❌ Failed to load sample: {e}")
             sys.exit(1)
+
+        # The line-level tests all want stripped lines; split and strip
+        # once here and tally comments, non-blank lines, and imports in a
+        # single loop instead of one split-and-scan per test
+        self._stripped = [line.strip() for line in self.sample_code.split('\n')]
+        self._comment_lines = 0
+        self._total_lines = 0
+        self._import_lines = []
+        for stripped in self._stripped:
+            if not stripped:
+                continue
+            self._total_lines += 1
+            if stripped.startswith('#'):
+                self._comment_lines += 1
+            elif stripped.startswith(('import ', 'from ')):
+                self._import_lines.append(stripped)
     
     def test_comment_density(self):
         """Test comment density analysis"""
-        lines = self.sample_code.split('\n')
-        comment_lines = sum(1 for line in lines if line.strip().startswith('#'))
-        total_lines = len([line for line in lines if line.strip()])
-        
+        comment_lines = self._comment_lines
+        total_lines = self._total_lines
+
         if total_lines > 0:
             comment_ratio = comment_lines / total_lines
             is_suspicious = comment_ratio > 0.25
@@ -58,30 +164,18 @@ class AIDetectionTester:
             }
             
             status = "🔍 SUSPICIOUS" if is_suspicious else "✅ NORMAL"
-            print(f"\n📝 Comment Density Analysis:")
-            print(f"   {status} - Ratio: {comment_ratio:.3f} (threshold: 0.25)")
-            print(f"   Comment lines: {comment_lines}/{total_lines}")
+            with self._print_lock:
+                print(f"\n📝 Comment Density Analysis:")
+                print(f"   {status} - Ratio: {comment_ratio:.3f} (threshold: 0.25)")
+                print(f"   Comment lines: {comment_lines}/{total_lines}")
         
         return self.results.get('comment_density', {})
     
     def test_function_patterns(self):
         """Test AI function naming patterns"""
-        patterns = {
-            'verb_noun_noun': r'def \w+_\w+_\w+\(',
-            'collect_pattern': r'def collect_\w+\(',
-            'generate_pattern': r'def generate_\w+\(',
-            'simulate_pattern': r'def simulate_\w+\(',
-            'handle_pattern': r'def handle_\w+\(',
-        }
-        
-        matches = {}
-        total_matches = 0
-        
-        for pattern_name, pattern in patterns.items():
-            found = re.findall(pattern, self.sample_code)
-            matches[pattern_name] = len(found)
-            total_matches += len(found)
-        
+        matches = dict(_function_pattern_counts(self.sample_code))
+        total_matches = sum(matches.values())
+
         is_suspicious = total_matches > 3
         
         self.results['function_patterns'] = {
@@ -92,28 +186,28 @@ class AIDetectionTester:
         }
         
         status = "🔍 SUSPICIOUS" if is_suspicious else "✅ NORMAL"
-        print(f"\n🔧 Function Pattern Analysis:")
-        print(f"   {status} - Total matches: {total_matches} (threshold: 3)")
-        for pattern_name, count in matches.items():
-            if count > 0:
-                print(f"   - {pattern_name}: {count}")
+        with self._print_lock:
+            print(f"\n🔧 Function Pattern Analysis:")
+            print(f"   {status} - Total matches: {total_matches} (threshold: 3)")
+            for pattern_name, count in matches.items():
+                if count > 0:
+                    print(f"   - {pattern_name}: {count}")
         
         return self.results['function_patterns']
     
     def test_import_analysis(self):
         """Test import statement analysis"""
-        import_lines = [line.strip() for line in self.sample_code.split('\n') 
-                       if line.strip().startswith('import ') or line.strip().startswith('from ')]
-        
-        common_ai_imports = [
-            'os', 'sys', 'time', 'json', 'base64', 
-            'hashlib', 'random', 'string', 'urllib', 'datetime'
-        ]
-        
-        found_imports = []
-        for imp in common_ai_imports:
-            if any(imp in line for line in import_lines):
-                found_imports.append(imp)
+        import_lines = self._import_lines
+
+        # One linear pass: parse the top-level module name out of each
+        # import line and check set membership, instead of a substring
+        # scan of every line per candidate module
+        present = set()
+        for line in import_lines:
+            m = _IMPORT_RE.match(line)
+            if m:
+                present.add(m.group(1).split('.')[0])
+        found_imports = [imp for imp in _AI_IMPORTS if imp in present]
         
         is_suspicious = len(found_imports) > 5
         
@@ -126,24 +220,17 @@ class AIDetectionTester:
         }
         
         status = "🔍 SUSPICIOUS" if is_suspicious else "✅ NORMAL"
-        print(f"\n📦 Import Analysis:")
-        print(f"   {status} - AI imports: {len(found_imports)}/10 (threshold: 5)")
-        print(f"   Total imports: {len(import_lines)}")
-        print(f"   AI imports found: {', '.join(found_imports)}")
+        with self._print_lock:
+            print(f"\n📦 Import Analysis:")
+            print(f"   {status} - AI imports: {len(found_imports)}/10 (threshold: 5)")
+            print(f"   Total imports: {len(import_lines)}")
+            print(f"   AI imports found: {', '.join(found_imports)}")
         
         return self.results['import_analysis']
     
     def test_entropy_analysis(self):
         """Test entropy analysis"""
-        data = self.sample_code.encode()
-        byte_counts = Counter(data)
-        total_bytes = len(data)
-        entropy = 0
-        
-        for count in byte_counts.values():
-            p = count / total_bytes
-            if p > 0:
-                entropy -= p * math.log2(p)
+        entropy = _entropy(bytes(self._mm))
         
         # AI-generated code typically has entropy between 4.0-5.5
         is_suspicious = 4.0 <= entropy <= 5.5
@@ -155,25 +242,16 @@ class AIDetectionTester:
         }
         
         status = "🔍 SUSPICIOUS" if is_suspicious else "✅ NORMAL"
-        print(f"\n🌪️ Entropy Analysis:")
-        print(f"   {status} - Entropy: {entropy:.3f} (AI range: 4.0-5.5)")
+        with self._print_lock:
+            print(f"\n🌪️ Entropy Analysis:")
+            print(f"   {status} - Entropy: {entropy:.3f} (AI range: 4.0-5.5)")
         
         return self.results['entropy_analysis']
     
     def test_class_patterns(self):
         """Test AI class naming patterns"""
-        class_patterns = [
-            r'class \w+Manager',
-            r'class \w+Handler',
-            r'class \w+Gatherer',
-            r'class \w+Communicator'
-        ]
-        
-        found_classes = []
-        for pattern in class_patterns:
-            matches = re.findall(pattern, self.sample_code)
-            found_classes.extend(matches)
-        
+        found_classes = list(_class_pattern_matches(self.sample_code))
+
         is_suspicious = len(found_classes) > 1
         
         self.results['class_patterns'] = {
@@ -184,32 +262,21 @@ class AIDetectionTester:
         }
         
         status = "🔍 SUSPICIOUS" if is_suspicious else "✅ NORMAL"
-        print(f"\n🏗️ Class Pattern Analysis:")
-        print(f"   {status} - AI class patterns: {len(found_classes)} (threshold: 1)")
-        if found_classes:
-            for cls in found_classes:
-                print(f"   - {cls}")
+        with self._print_lock:
+            print(f"\n🏗️ Class Pattern Analysis:")
+            print(f"   {status} - AI class patterns: {len(found_classes)} (threshold: 1)")
+            if found_classes:
+                for cls in found_classes:
+                    print(f"   - {cls}")
         
         return self.results['class_patterns']
     
     def test_string_patterns(self):
         """Test suspicious string patterns"""
-        ai_strings = [
-            "This is a comment explaining",
-            "Function to process",
-            "Method to gather",
-            "This demonstrates",
-            "[INFO]",
-            "[ERROR]",
-            "[STAGE"
-        ]
-        
-        found_strings = []
-        for string in ai_strings:
-            if string in self.sample_code:
-                count = self.sample_code.count(string)
-                found_strings.append({'string': string, 'count': count})
-        
+        counts = dict(_string_pattern_counts(self.sample_code))
+
+        found_strings = [{'string': s, 'count': c}
+                         for s, c in counts.items() if c]
         total_matches = sum(item['count'] for item in found_strings)
         is_suspicious = total_matches > 5
         
@@ -221,33 +288,27 @@ class AIDetectionTester:
         }
         
         status = "🔍 SUSPICIOUS" if is_suspicious else "✅ NORMAL"
-        print(f"\n🔤 String Pattern Analysis:")
-        print(f"   {status} - AI strings: {total_matches} (threshold: 5)")
-        for item in found_strings[:3]:  # Show top 3
-            print(f"   - '{item['string']}': {item['count']} times")
+        with self._print_lock:
+            print(f"\n🔤 String Pattern Analysis:")
+            print(f"   {status} - AI strings: {total_matches} (threshold: 5)")
+            for item in found_strings[:3]:  # Show top 3
+                print(f"   - '{item['string']}': {item['count']} times")
         
         return self.results['string_patterns']
     
     def calculate_overall_score(self):
         """Calculate overall AI detection score"""
-        score = 0
-        max_score = 0
-        
-        # Weight different detection methods
-        weights = {
-            'comment_density': 0.2,
-            'function_patterns': 0.2,
-            'import_analysis': 0.15,
-            'entropy_analysis': 0.15,
-            'class_patterns': 0.15,
-            'string_patterns': 0.15
-        }
-        
-        for method, weight in weights.items():
-            if method in self.results:
-                if self.results[method].get('suspicious', False):
-                    score += weight
+        score = 0.0
+        max_score = 0.0
+
+        # One lookup per method: fetch the result once and bump both
+        # accumulators from it
+        for method, weight in _WEIGHTS:
+            result = self.results.get(method)
+            if result is not None:
                 max_score += weight
+                if result.get('suspicious', False):
+                    score += weight
         
         final_score = score / max_score if max_score > 0 else 0
         
@@ -261,14 +322,10 @@ class AIDetectionTester:
     
     def classify_sample(self, score):
         """Classify sample based on score"""
-        if score >= 0.7:
-            return "🔴 HIGHLY SUSPICIOUS (AI-Generated)"
-        elif score >= 0.5:
-            return "🟡 SUSPICIOUS (Possibly AI-Generated)"
-        elif score >= 0.3:
-            return "🟠 MODERATE (Some AI Patterns)"
-        else:
-            return "🟢 CLEAN (Low AI Patterns)"
+        for threshold, label in _CLASSIFICATIONS:
+            if score >= threshold:
+                return label
+        return _CLASSIFICATIONS[-1][1]
     
     def run_all_tests(self):
         """Run all detection tests"""
@@ -276,13 +333,15 @@ class AIDetectionTester:
         print("🤖 AI-GENERATED MALWARE DETECTION TESTING")
         print("="*60)
         
-        # Run individual tests
-        self.test_comment_density()
-        self.test_function_patterns()
-        self.test_import_analysis()
-        self.test_entropy_analysis()
-        self.test_class_patterns()
-        self.test_string_patterns()
+        # The six analyzers are independent (each writes its own results
+        # key), so fan them out on a pool; the vectorized cores release
+        # the GIL during their C-level scans and overlap
+        tests = (self.test_comment_density, self.test_function_patterns,
+                 self.test_import_analysis, self.test_entropy_analysis,
+                 self.test_class_patterns, self.test_string_patterns)
+        with ThreadPoolExecutor(max_workers=len(tests)) as executor:
+            for future in [executor.submit(test) for test in tests]:
+                future.result()
         
         # Calculate overall score
         overall_score = self.calculate_overall_score()
@@ -338,12 +397,63 @@ class AIDetectionTester:
     def save_results(self, output_file="detection_results.json"):
         """Save results to JSON file"""
         try:
-            with open(output_file, 'w') as f:
-                json.dump(self.results, f, indent=2)
+            # Serialize once and publish with os.replace so a crash mid-
+            # write never leaves truncated JSON behind
+            out_path = Path(output_file)
+            tmp_path = out_path.with_suffix('.tmp')
+            tmp_path.write_bytes(_json_dumps_indented(self.results))
+            os.replace(tmp_path, out_path)
             print(f"\n💾 Results saved to: {output_file}")
         except Exception as e:
             print(f"❌ Failed to save results: {e}")
 
+# Content-keyed caches for the pure analyzers: when a batch driver (or a
+# retest) feeds the same content through again, the scans are served from
+# the cache instead of being recomputed
+
+@functools.lru_cache(maxsize=256)
+def _entropy(data):
+    """Shannon entropy of a byte string"""
+    if np is not None:
+        # One C-level histogram plus a 256-bin reduction instead of a
+        # Python dict op per byte
+        arr = np.frombuffer(data, dtype=np.uint8)
+        counts = np.bincount(arr, minlength=256)
+        p = counts[counts > 0] / arr.size
+        return float(-(p * np.log2(p)).sum())
+
+    byte_counts = Counter(data)
+    total_bytes = len(data)
+    entropy = 0
+    for count in byte_counts.values():
+        p = count / total_bytes
+        if p > 0:
+            entropy -= p * math.log2(p)
+    return entropy
+
+@functools.lru_cache(maxsize=256)
+def _function_pattern_counts(code):
+    """Per-group match counts for the function naming patterns"""
+    counts = dict.fromkeys(
+        ('verb_noun_noun', 'collect_pattern', 'generate_pattern',
+         'simulate_pattern', 'handle_pattern'), 0)
+    for m in _FUNC_RE.finditer(code):
+        counts[m.lastgroup] += 1
+    return tuple(counts.items())
+
+@functools.lru_cache(maxsize=256)
+def _class_pattern_matches(code):
+    """AI-style class declarations found in the source"""
+    return tuple(_CLASS_RE.findall(code))
+
+@functools.lru_cache(maxsize=256)
+def _string_pattern_counts(code):
+    """Occurrence counts for the AI marker strings"""
+    counts = dict.fromkeys(_AI_STRINGS, 0)
+    for m in _STRING_RE.finditer(code):
+        counts[m.group()] += 1
+    return tuple(counts.items())
+
 def main():
     """Main function"""
     if len(sys.argv) != 2: